@@ -0,0 +1,468 @@
+"""
+Market Dashboard - 데이터 수집 모듈
+Streamlit 없이 import 가능한 fetch 로직 + 관심종목 설정
+(streamlit_app.py 와 snapshot.py 가 함께 사용)
+"""
+import requests
+from datetime import datetime, timedelta
+import yfinance as yf
+from yfinance.exceptions import YFException, YFRateLimitError, YFTickerMissingError
+import pandas as pd
+import json
+import os
+import threading
+
+
+# ===== 관심종목 설정 =====
+# (제목, 티커, 표시 형식, 캔들차트 표시, 1개월 차트 표시)
+INDEX_TICKERS = [
+    ("VIX (공포지수)", "^VIX", '{:.2f}', False, True),
+    ("10년물 국채금리 (%)", "^TNX", '{:.2f}', False, False),
+    ("하이일드 (HYG ETF)", "HYG", '{:.2f}', False, False),
+    ("달러 인덱스", "DX-Y.NYB", '{:.2f}', False, False),
+    ("금 (Gold)", "GC=F", '{:,.0f}', False, False),
+    ("비트코인", "BTC-USD", '{:,.0f}', True, False),
+    ("NASDAQ", "^IXIC", '{:,.0f}', True, False),
+]
+
+ETF_TICKERS = [
+    ("SPY (S&P 500 ETF)", "SPY", '{:.2f}', True, False),
+    ("QQQ (NASDAQ 100 ETF)", "QQQ", '{:.2f}', True, False),
+    ("TQQQ (NASDAQ 3x)", "TQQQ", '{:.2f}', True, False),
+    ("SCHD (배당 ETF)", "SCHD", '{:.2f}', True, False),
+    ("BLOK (블록체인 ETF)", "BLOK", '{:.2f}', True, False),
+]
+
+STOCK_TICKERS = [
+    ("AAPL (Apple)", "AAPL", '{:.2f}', True, False),
+    ("CRCL (Circle)", "CRCL", '{:.2f}', True, False),
+    ("DIS (Disney)", "DIS", '{:.2f}', True, False),
+    ("GOOG (Alphabet)", "GOOG", '{:.2f}', True, False),
+    ("INMD (InMode)", "INMD", '{:.2f}', True, False),
+    ("MSTR (MicroStrategy)", "MSTR", '{:.2f}', True, False),
+    ("NVDA (NVIDIA)", "NVDA", '{:.2f}', True, False),
+    ("PFE (Pfizer)", "PFE", '{:.2f}', True, False),
+    ("PLTR (Palantir)", "PLTR", '{:.2f}', True, False),
+    ("TSLA (Tesla)", "TSLA", '{:.2f}', True, False),
+    ("UNH (UnitedHealth)", "UNH", '{:.2f}', True, False),
+    ("XOM (ExxonMobil)", "XOM", '{:.2f}', True, False),
+]
+
+# 3년 라인차트 + 200일 MA 계산에 필요한 조회 기간
+HISTORY_DAYS = 365*3 + 30
+OHLC_DAYS = 500
+
+
+def configured_tickers():
+    """설정된 전체 티커 목록 (표시 순서)"""
+    return [row[1] for row in INDEX_TICKERS + ETF_TICKERS + STOCK_TICKERS]
+
+
+# ===== 로컬 파일 저장 설정 =====
+SAVE_FILE = "custom_tickers.json"
+
+
+def load_custom_tickers():
+    """로컬 파일에서 사용자 티커 목록 불러오기"""
+    try:
+        if os.path.exists(SAVE_FILE):
+            with open(SAVE_FILE, 'r') as f:
+                data = json.load(f)
+                return data.get('custom_tickers', [])
+        return []
+    except:
+        return []
+
+
+# ===== 장애 처리 =====
+class DataUnavailable(Exception):
+    """조회 실패 또는 빈 데이터 (st.cache_data 가 실패를 캐시하지 않도록 None 대신 예외)"""
+
+
+class CircuitOpen(DataUnavailable):
+    """서킷브레이커 차단 중이라 호출하지 않음"""
+
+
+class CircuitBreaker:
+    """
+    키(티커 / 제공처)별 연속 실패 기록
+    연속 실패가 threshold 이상이면 base_delay * 2^n (최대 max_delay) 동안 호출 차단
+    차단 시간이 끝나면 한 번만 재시도 허용
+    """
+
+    def __init__(self, threshold=1, base_delay=60, max_delay=3600):
+        self.threshold = threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._state = {}
+
+    def _entry(self, key):
+        if key not in self._state:
+            self._state[key] = {
+                'failures': 0,
+                'total_failures': 0,
+                'open_until': None,
+                'last_error': None,
+                'last_failure': None,
+                'last_success': None,
+            }
+        return self._state[key]
+
+    def blocked(self, key, now=None):
+        """차단 중인지 확인만 (재시도 기회를 쓰지 않음)"""
+        now = now or datetime.now()
+        with self._lock:
+            entry = self._state.get(key)
+            return entry is not None and entry['open_until'] is not None and now < entry['open_until']
+
+    def allow(self, key, now=None):
+        """호출 가능 여부 - 차단 시간이 끝났으면 재시도 기회를 가져감"""
+        now = now or datetime.now()
+        with self._lock:
+            entry = self._state.get(key)
+            if entry is None or entry['open_until'] is None:
+                return True
+            if now < entry['open_until']:
+                return False
+            # 재시도 1회 - 결과가 나올 때까지 다른 호출은 차단
+            entry['open_until'] = now + timedelta(seconds=self.base_delay)
+            return True
+
+    def record_success(self, key, now=None):
+        with self._lock:
+            entry = self._entry(key)
+            entry['failures'] = 0
+            entry['open_until'] = None
+            entry['last_success'] = now or datetime.now()
+
+    def record_failure(self, key, error=None, now=None):
+        now = now or datetime.now()
+        with self._lock:
+            entry = self._entry(key)
+            entry['failures'] += 1
+            entry['total_failures'] += 1
+            entry['last_failure'] = now
+            entry['last_error'] = str(error) if error is not None else None
+            if entry['failures'] >= self.threshold:
+                delay = self.base_delay * 2 ** (entry['failures'] - self.threshold)
+                entry['open_until'] = now + timedelta(seconds=min(delay, self.max_delay))
+
+    def restore(self, rows):
+        """stats() 로 저장해 둔 상태 복원 (이미 기록이 있는 키는 유지)"""
+        with self._lock:
+            for row in rows:
+                if row['key'] in self._state:
+                    continue
+                entry = self._entry(row['key'])
+                entry['failures'] = row.get('failures', 0)
+                entry['total_failures'] = row.get('total_failures', 0)
+                entry['last_error'] = row.get('last_error')
+                for field in ('open_until', 'last_failure', 'last_success'):
+                    value = row.get(field)
+                    entry[field] = datetime.fromisoformat(value) if isinstance(value, str) else value
+
+    def stats(self):
+        """실패 기록이 있는 키만"""
+        with self._lock:
+            return [
+                dict(entry, key=key)
+                for key, entry in self._state.items()
+                if entry['total_failures'] > 0
+            ]
+
+
+YAHOO = 'yahoo'
+CNN = 'cnn'
+
+# 티커: 첫 실패부터 차단 (신규 상장 / 상장폐지 종목), 최대 6시간
+# 키는 종목 코드 - 현재가 / 일봉 / 배치 조회가 같은 상태를 공유
+TICKER_BREAKER = CircuitBreaker(threshold=1, base_delay=60, max_delay=6*3600)
+# 제공처: 여러 종목이 연달아 실패할 때만 차단 (전체 장애), 최대 30분
+PROVIDER_BREAKER = CircuitBreaker(threshold=5, base_delay=30, max_delay=1800)
+
+YAHOO_PROBE_URL = "https://query2.finance.yahoo.com/v8/finance/chart/SPY"
+PROBE_TTL = timedelta(seconds=30)
+_probe = {'checked_at': None, 'reachable': True}
+_probe_lock = threading.Lock()
+
+
+def _yahoo_reachable():
+    """Yahoo 응답 여부 (30초 캐시) - 네트워크 오류 / 429 / 5xx 면 False"""
+    now = datetime.now()
+    with _probe_lock:
+        if _probe['checked_at'] is not None and now - _probe['checked_at'] < PROBE_TTL:
+            return _probe['reachable']
+    try:
+        response = requests.get(
+            YAHOO_PROBE_URL, params={'range': '1d', 'interval': '1d'},
+            headers={'User-Agent': 'Mozilla/5.0'}, timeout=5
+        )
+        # 429(요청 제한)도 정상 응답으로 보지 않음
+        reachable = response.status_code < 500 and response.status_code != 429
+    except requests.RequestException:
+        reachable = False
+    with _probe_lock:
+        _probe.update(checked_at=now, reachable=reachable)
+    return reachable
+
+
+def _is_provider_error(error, provider):
+    """네트워크 / HTTP / 요청 제한 -> 제공처 장애, 그 외(종목 없음, 빈 데이터) -> 해당 종목 문제"""
+    if isinstance(error, YFRateLimitError):
+        return True
+    if isinstance(error, (YFTickerMissingError, DataUnavailable)):
+        # yfinance 는 timezone 조회의 네트워크 오류도 '종목 없음'으로 보고하므로 직접 확인
+        return provider == YAHOO and not _yahoo_reachable()
+    if isinstance(error, YFException):
+        return False
+    # requests / curl_cffi 예외는 모두 OSError 계열
+    return isinstance(error, OSError)
+
+
+def _guarded_call(key, provider, call):
+    """
+    티커 / 제공처 차단 여부를 먼저 확인하고, 둘 다 열려 있을 때만 재시도 기회를 가져가 call() 실행
+    결과는 브레이커에 기록, st.cache_data 안쪽에서 호출되므로 캐시 적중 시에는 브레이커를 거치지 않음
+    """
+    if TICKER_BREAKER.blocked(key):
+        raise CircuitOpen(f"{key}: 차단 중")
+    if PROVIDER_BREAKER.blocked(provider):
+        raise CircuitOpen(f"{provider}: 차단 중")
+    if not (TICKER_BREAKER.allow(key) and PROVIDER_BREAKER.allow(provider)):
+        # 다른 호출이 먼저 재시도 중
+        raise CircuitOpen(f"{key}: 재시도 중")
+
+    try:
+        value = call()
+    except Exception as e:
+        if _is_provider_error(e, provider):
+            PROVIDER_BREAKER.record_failure(provider, e)
+        else:
+            # 제공처는 응답함 - 종목만 실패 처리
+            PROVIDER_BREAKER.record_success(provider)
+            TICKER_BREAKER.record_failure(key, e)
+        if isinstance(e, DataUnavailable):
+            raise
+        raise DataUnavailable(f"{key}: {e}") from e
+
+    PROVIDER_BREAKER.record_success(provider)
+    TICKER_BREAKER.record_success(key)
+    return value
+
+
+# 키 -> (마지막 정상값, 조회 시각)
+_last_good = {}
+_last_good_lock = threading.Lock()
+
+
+def fetch_with_fallback(fetch, key):
+    """
+    fetch() 호출 -> (값, stale_as_of)
+    fetch 는 (값, 실제 조회 시각)을 반환 - 캐시 적중이어도 처음 내려받은 시각이 기록되도록
+    DataUnavailable(조회 실패, 차단 포함)이면 마지막 정상값과 그 조회 시각, 그것도 없으면 (None, None)
+    """
+    try:
+        value, fetched_at = fetch()
+    except DataUnavailable:
+        with _last_good_lock:
+            good = _last_good.get(key)
+        if good is None:
+            return None, None
+        return good
+
+    with _last_good_lock:
+        _last_good[key] = (value, fetched_at)
+    return value, None
+
+
+def breaker_stats():
+    """운영자용 실패 현황 (제공처 + 티커)"""
+    rows = []
+    for scope, breaker in (('provider', PROVIDER_BREAKER), ('ticker', TICKER_BREAKER)):
+        for entry in breaker.stats():
+            rows.append(dict(entry, scope=scope))
+    return rows
+
+
+def restore_breakers(rows):
+    """breaker_stats() 결과로 브레이커 상태 복원 (스냅샷 작업의 실행 간 유지용)"""
+    PROVIDER_BREAKER.restore([row for row in rows if row.get('scope') == 'provider'])
+    TICKER_BREAKER.restore([row for row in rows if row.get('scope') == 'ticker'])
+
+
+# ===== 가공 함수 =====
+def summarize_close(close, now=None):
+    """종가 시리즈 -> 현재가, 등락률, 1M/1Y/3Y 구간"""
+    if close is None or len(close) == 0:
+        return None
+
+    current = float(close.iloc[-1])
+    prev = float(close.iloc[-2]) if len(close) > 1 else current
+    change = ((current - prev) / prev) * 100 if prev != 0 else 0
+
+    if now is None:
+        now = datetime.now()
+
+    month_ago = now - timedelta(days=30)
+    history_1m = close[close.index >= month_ago.strftime('%Y-%m-%d')]
+
+    year_ago = now - timedelta(days=365)
+    history_1y = close[close.index >= year_ago.strftime('%Y-%m-%d')]
+
+    three_years_ago = now - timedelta(days=365*3)
+    history_3y = close[close.index >= three_years_ago.strftime('%Y-%m-%d')]
+
+    return {
+        'current': current,
+        'change': change,
+        '1M': history_1m,
+        '1Y': history_1y,
+        '3Y': history_3y
+    }
+
+
+def build_ohlc_6m(ohlc):
+    """일봉 OHLC -> 200일 MA 추가 후 최근 6개월(130일)"""
+    ohlc = ohlc.dropna().copy()
+    ohlc['MA200'] = ohlc['Close'].rolling(window=200).mean()
+    return ohlc.tail(130)
+
+
+def _column(data, field, ticker):
+    """yf.download 결과에서 (필드, 티커) 컬럼 추출 (단일/멀티 컬럼 모두 처리)"""
+    if isinstance(data.columns, pd.MultiIndex):
+        return data[field][ticker]
+    return data[field]
+
+
+def _ohlc_frame(data, ticker):
+    return pd.DataFrame({
+        'Open': _column(data, 'Open', ticker),
+        'High': _column(data, 'High', ticker),
+        'Low': _column(data, 'Low', ticker),
+        'Close': _column(data, 'Close', ticker)
+    })
+
+
+# ===== 데이터 가져오기 =====
+def fetch_fear_greed():
+    """CNN Fear & Greed (실패 / 차단 시 DataUnavailable)"""
+    def load():
+        url = "https://production.dataviz.cnn.io/index/fearandgreed/graphdata"
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Accept': 'application/json, text/plain, */*',
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Referer': 'https://edition.cnn.com/',
+            'Origin': 'https://edition.cnn.com',
+        }
+        response = requests.get(url, headers=headers, timeout=10)
+        response.raise_for_status()
+        data = response.json()
+        fg = data.get('fear_and_greed', {})
+
+        return {
+            'score': fg.get('score', 0),
+            'previous_close': fg.get('previous_close', 0),
+            'previous_1_week': fg.get('previous_1_week', 0),
+            'previous_1_month': fg.get('previous_1_month', 0),
+            'previous_1_year': fg.get('previous_1_year', 0),
+            'success': True
+        }
+
+    return _guarded_call('fear_greed', CNN, load)
+
+
+def _history(ticker, days):
+    """
+    티커 하나의 일봉
+    yf.download 는 오류를 삼키고 빈 데이터를 주므로 raise_errors 로 종목 오류 / 네트워크 오류를 구분
+    """
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days)
+
+    data = yf.Ticker(ticker).history(start=start_date, end=end_date, raise_errors=True)
+    if data.empty:
+        raise DataUnavailable(f"{ticker}: 빈 데이터")
+    if data.index.tz is not None:
+        data.index = data.index.tz_localize(None)
+    return data
+
+
+def fetch_market_data(ticker):
+    """현재가 + 1M/1Y/3Y 종가 (실패 / 차단 시 DataUnavailable)"""
+    def load():
+        close = _history(ticker, HISTORY_DAYS)['Close'].dropna()
+        result = summarize_close(close)
+        if result is None:
+            raise DataUnavailable(f"{ticker}: 종가 없음")
+        return result
+
+    return _guarded_call(ticker, YAHOO, load)
+
+
+def fetch_ohlc_data_6m(ticker):
+    """6개월 일봉 + 200일 MA (실패 / 차단 시 DataUnavailable)"""
+    def load():
+        ohlc = build_ohlc_6m(_history(ticker, OHLC_DAYS)[['Open', 'High', 'Low', 'Close']])
+        if len(ohlc) == 0:
+            raise DataUnavailable(f"{ticker}: 일봉 없음")
+        return ohlc
+
+    return _guarded_call(ticker, YAHOO, load)
+
+
+def fetch_history_batch(tickers, start_date, end_date):
+    """
+    여러 티커를 한 번의 yf.download 로 조회 -> {티커: 일봉 OHLC}
+    차단 중인 티커는 제외하고, 결과를 티커 / 제공처 브레이커에 기록
+    """
+    if PROVIDER_BREAKER.blocked(YAHOO):
+        return {}
+    tickers = [t for t in tickers if not TICKER_BREAKER.blocked(t)]
+    if not tickers or not PROVIDER_BREAKER.allow(YAHOO):
+        return {}
+    tickers = [t for t in tickers if TICKER_BREAKER.allow(t)]
+    if not tickers:
+        return {}
+
+    try:
+        data = yf.download(
+            list(tickers), start=start_date, end=end_date,
+            progress=False, group_by='column', threads=True
+        )
+    except Exception as e:
+        PROVIDER_BREAKER.record_failure(YAHOO, e)
+        return {}
+
+    result = {}
+    for ticker in tickers:
+        if data.empty:
+            break
+        try:
+            ohlc = _ohlc_frame(data, ticker).dropna()
+        except KeyError:
+            continue
+        if len(ohlc) > 0:
+            result[ticker] = ohlc
+
+    if not result and not _yahoo_reachable():
+        PROVIDER_BREAKER.record_failure(YAHOO, "배치 전체 조회 실패")
+        return {}
+
+    PROVIDER_BREAKER.record_success(YAHOO)
+    for ticker in tickers:
+        if ticker in result:
+            TICKER_BREAKER.record_success(ticker)
+        else:
+            TICKER_BREAKER.record_failure(ticker, "빈 데이터")
+    return result
+
+
+def get_ticker_name(ticker):
+    try:
+        info = yf.Ticker(ticker).info
+        return info.get('shortName', ticker)
+    except:
+        return ticker
@@ -0,0 +1,164 @@
+"""
+Market Dashboard - 크로스에셋 리스크
+관심종목 전체의 일간 수익률 행렬 -> 롤링 상관계수, SPY/QQQ 베타, 롤링 변동성
+새 일봉은 누적합(합, 제곱합, 곱의 합)에 더하고 윈도우에서 빠지는 일봉만 빼서 갱신
+"""
+import numpy as np
+import pandas as pd
+
+
+RISK_WINDOW = 60
+MIN_PERIODS = 20
+TRADING_DAYS = 252
+BENCHMARKS = ['SPY', 'QQQ']
+
+
+def build_returns(closes):
+    """{티커: 종가 시리즈} -> 날짜 정렬된 일간 수익률 행렬 (평일 기준)"""
+    returns = {}
+    for ticker, close in closes.items():
+        # 코인(주말 거래)도 주식처럼 평일 종가끼리 비교, 휴장일은 채우지 않고 결측으로 둠
+        close = close[close.index.dayofweek < 5].dropna()
+        returns[ticker] = (close / close.shift(1) - 1).iloc[1:]
+    return pd.DataFrame(returns).sort_index().dropna(how='all')
+
+
+class RollingRisk:
+    """
+    최근 window 개 일봉의 pairwise 통계를 행렬로 유지
+    결측(상장 전 등)은 쌍별로 제외 -> 종목마다 관측 수가 달라도 됨
+    """
+
+    def __init__(self, tickers, window=RISK_WINDOW, min_periods=MIN_PERIODS):
+        self.tickers = list(tickers)
+        self.window = window
+        self.min_periods = min_periods
+        self.last_date = None
+
+        n = len(self.tickers)
+        self._buffer = np.full((window, n), np.nan)
+        self._pos = 0
+        self._rows = 0
+        self._updates = 0
+
+        self._count = np.zeros((n, n))   # 두 종목 모두 관측된 일수
+        self._sum = np.zeros((n, n))     # [i, j]: j 관측일의 x_i 합
+        self._sumsq = np.zeros((n, n))   # [i, j]: j 관측일의 x_i^2 합
+        self._cross = np.zeros((n, n))   # [i, j]: x_i * x_j 합
+
+    @classmethod
+    def from_returns(cls, returns, window=RISK_WINDOW, min_periods=MIN_PERIODS):
+        """수익률 행렬의 마지막 window 개 일봉으로 초기화"""
+        state = cls(returns.columns, window, min_periods)
+        if len(returns) == 0:
+            return state
+
+        tail = returns.to_numpy(dtype=float)[-window:]
+        state._rows = len(tail)
+        state._buffer[:state._rows] = tail
+        state._pos = state._rows % window
+        state._accumulate(tail, 1.0)
+        state.last_date = returns.index[-1]
+        return state
+
+    def _accumulate(self, rows, sign):
+        valid = ~np.isnan(rows)
+        x = np.where(valid, rows, 0.0)
+        m = valid.astype(float)
+        self._count += sign * (m.T @ m)
+        self._sum += sign * (x.T @ m)
+        self._sumsq += sign * ((x * x).T @ m)
+        self._cross += sign * (x.T @ x)
+
+    def _rebuild(self):
+        """누적 오차 제거용 - 버퍼 전체로 다시 합산"""
+        for acc in (self._count, self._sum, self._sumsq, self._cross):
+            acc.fill(0.0)
+        self._accumulate(self._buffer, 1.0)
+
+    def update(self, date, row):
+        """새 일봉 수익률 1개 반영 - O(N^2), 윈도우 길이와 무관"""
+        row = np.asarray(row, dtype=float)
+        if self._rows == self.window:
+            self._accumulate(self._buffer[self._pos][None, :], -1.0)
+        else:
+            self._rows += 1
+
+        self._buffer[self._pos] = row
+        self._accumulate(row[None, :], 1.0)
+        self._pos = (self._pos + 1) % self.window
+        self.last_date = date
+
+        self._updates += 1
+        if self._updates % self.window == 0:
+            self._rebuild()
+
+    def replace_last(self, row):
+        """마지막 일봉 교체 (장중 종가 갱신)"""
+        last = (self._pos - 1) % self.window
+        row = np.asarray(row, dtype=float)
+        self._accumulate(self._buffer[last][None, :], -1.0)
+        self._buffer[last] = row
+        self._accumulate(row[None, :], 1.0)
+
+    def extend(self, returns):
+        """last_date 이후의 일봉만 순서대로 반영, 반영한 개수 반환"""
+        if self.last_date is not None:
+            if self.last_date in returns.index:
+                self.replace_last(returns.loc[self.last_date].reindex(self.tickers).to_numpy(dtype=float))
+            returns = returns[returns.index > self.last_date]
+        values = returns.reindex(columns=self.tickers).to_numpy(dtype=float)
+        for date, row in zip(returns.index, values):
+            self.update(date, row)
+        return len(returns)
+
+    # ===== 결과 =====
+    def _pair_stats(self):
+        """쌍별 공분산, 분산(i), 분산(j) - 관측 부족은 NaN"""
+        n = np.where(self._count >= max(self.min_periods, 2), self._count, np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = (self._cross - self._sum * self._sum.T / n) / (n - 1)
+            var_i = (self._sumsq - self._sum ** 2 / n) / (n - 1)
+        return cov, var_i, var_i.T
+
+    def correlation(self):
+        cov, var_i, var_j = self._pair_stats()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = cov / np.sqrt(var_i * var_j)
+        corr = np.clip(corr, -1.0, 1.0)
+        diag = np.diag(corr).copy()
+        np.fill_diagonal(corr, np.where(np.isnan(diag), np.nan, 1.0))
+        return pd.DataFrame(corr, index=self.tickers, columns=self.tickers)
+
+    def beta(self, benchmark):
+        """벤치마크 대비 베타 (벤치마크가 없으면 None)"""
+        if benchmark not in self.tickers:
+            return None
+        b = self.tickers.index(benchmark)
+        cov, var_i, var_j = self._pair_stats()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            beta = cov[:, b] / var_j[:, b]
+        return pd.Series(beta, index=self.tickers)
+
+    def volatility(self):
+        """연율화 변동성"""
+        cov, var_i, var_j = self._pair_stats()
+        vol = np.sqrt(np.clip(np.diag(var_i), 0.0, None) * TRADING_DAYS)
+        return pd.Series(vol, index=self.tickers)
+
+    def risk_table(self, benchmarks=BENCHMARKS):
+        table = pd.DataFrame(index=self.tickers)
+        for benchmark in benchmarks:
+            beta = self.beta(benchmark)
+            if beta is not None:
+                table[f'Beta {benchmark}'] = beta
+        table['Vol (연율)'] = self.volatility()
+        return table
+
+
+def update_risk(state, returns, window=RISK_WINDOW):
+    """기존 상태에 새 일봉만 반영, 종목 구성이 바뀌면 새로 생성"""
+    if state is None or state.window != window or list(returns.columns) != state.tickers:
+        return RollingRisk.from_returns(returns, window)
+    state.extend(returns)
+    return state
@@ -0,0 +1,329 @@
+"""
+Market Dashboard - 헤드리스 스냅샷
+설정 종목 + 사용자 추가 종목 전체를 한 번에 배치 조회해 버전이 붙은 스냅샷(JSON / Parquet)으로 저장
+Streamlit 앱, 알림, 리포트가 같은 스냅샷을 공유
+
+사용법:
+    python snapshot.py --out market_snapshot.json
+    python snapshot.py --out market_snapshot.parquet --workers 8
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import pandas as pd
+import json
+import os
+
+import market_data
+
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_FILE = "market_snapshot.json"
+OHLC_COLUMNS = ['Open', 'High', 'Low', 'Close', 'MA200']
+
+# 한 번의 yf.download 에 넣을 티커 수
+BATCH_SIZE = 50
+
+
+# ===== 스냅샷 생성 =====
+def _health():
+    """브레이커 현황 (JSON 저장용)"""
+    rows = []
+    for row in market_data.breaker_stats():
+        rows.append({
+            k: v.isoformat(timespec='seconds') if isinstance(v, datetime) else v
+            for k, v in row.items()
+        })
+    return rows
+
+
+def build_snapshot(tickers=None, custom_tickers=None, max_workers=4, previous=None):
+    """
+    전체 대시보드 데이터셋을 배치 + 동시 조회로 생성
+    previous(직전 스냅샷)가 있으면 조회 실패 종목은 직전 값을 stale_as_of 와 함께 유지하고,
+    직전 실행의 서킷브레이커 상태(health)를 이어받아 차단 중인 티커는 조회하지 않음
+    """
+    if previous is not None:
+        market_data.restore_breakers(previous.get('health', []))
+
+    if tickers is None:
+        tickers = market_data.configured_tickers()
+    if custom_tickers is None:
+        custom_tickers = market_data.load_custom_tickers()
+
+    all_tickers = list(dict.fromkeys(list(tickers) + list(custom_tickers)))
+    now = datetime.now()
+    start_date = now - timedelta(days=market_data.HISTORY_DAYS)
+
+    batches = [all_tickers[i:i + BATCH_SIZE] for i in range(0, len(all_tickers), BATCH_SIZE)]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        fng_future = pool.submit(
+            market_data.fetch_with_fallback,
+            lambda: (market_data.fetch_fear_greed(), datetime.now()), 'fear_greed'
+        )
+        name_futures = {t: pool.submit(market_data.get_ticker_name, t) for t in custom_tickers}
+        batch_futures = [
+            pool.submit(market_data.fetch_history_batch, batch, start_date, now)
+            for batch in batches
+        ]
+
+        history = {}
+        for future in batch_futures:
+            history.update(future.result())
+
+        names = {t: future.result() for t, future in name_futures.items()}
+        fear_greed, _ = fng_future.result()
+
+    previous_time = snapshot_time(previous) if previous is not None else None
+    if fear_greed is None:
+        if previous is not None and previous['fear_greed'].get('success'):
+            fear_greed = dict(previous['fear_greed'])
+            fear_greed.setdefault('stale_as_of', previous['generated_at'])
+        else:
+            fear_greed = {'score': 0, 'success': False}
+
+    entries = {}
+    for ticker in all_tickers:
+        ohlc = history.get(ticker)
+        summary = market_data.summarize_close(ohlc['Close'], now) if ohlc is not None else None
+        if summary is not None:
+            entries[ticker] = {
+                'name': names.get(ticker, ticker),
+                'current': summary['current'],
+                'change': summary['change'],
+                'close': summary['3Y'],
+                'ohlc': market_data.build_ohlc_6m(ohlc),
+                'stale_as_of': None,
+            }
+        elif previous is not None and ticker in previous['tickers']:
+            entry = dict(previous['tickers'][ticker])
+            entry['stale_as_of'] = entry.get('stale_as_of') or previous_time.isoformat(timespec='seconds')
+            entries[ticker] = entry
+
+    return {
+        'version': SNAPSHOT_VERSION,
+        'generated_at': now.isoformat(timespec='seconds'),
+        'fear_greed': fear_greed,
+        'tickers': entries,
+        'missing': [t for t in all_tickers if t not in history],
+        'health': _health(),
+    }
+
+
+# ===== 스냅샷 -> 대시보드 데이터 =====
+def snapshot_time(snapshot):
+    return datetime.fromisoformat(snapshot['generated_at'])
+
+
+def market_data_from_snapshot(snapshot, ticker):
+    """fetch_market_data 와 같은 형태로 변환 (없으면 None)"""
+    entry = snapshot['tickers'].get(ticker)
+    if entry is None:
+        return None
+    return market_data.summarize_close(entry['close'], snapshot_time(snapshot))
+
+
+def stale_as_of(snapshot, ticker):
+    """직전 스냅샷에서 넘겨받은 종목이면 그 조회 시각, 아니면 None"""
+    entry = snapshot['tickers'].get(ticker)
+    if entry is None or not entry.get('stale_as_of'):
+        return None
+    return datetime.fromisoformat(entry['stale_as_of'])
+
+
+def ohlc_from_snapshot(snapshot, ticker):
+    """fetch_ohlc_data_6m 과 같은 형태로 변환 (없으면 None)"""
+    entry = snapshot['tickers'].get(ticker)
+    if entry is None:
+        return None
+    return entry['ohlc']
+
+
+# ===== 저장 / 불러오기 =====
+def _detect_format(path, fmt):
+    if fmt:
+        return fmt
+    return 'parquet' if path.endswith('.parquet') else 'json'
+
+
+def _header(snapshot):
+    """시계열을 제외한 메타데이터"""
+    return {
+        'version': snapshot['version'],
+        'generated_at': snapshot['generated_at'],
+        'fear_greed': snapshot['fear_greed'],
+        'missing': snapshot.get('missing', []),
+        'health': snapshot.get('health', []),
+        'tickers': {
+            t: {
+                'name': e['name'],
+                'current': e['current'],
+                'change': e['change'],
+                'stale_as_of': e.get('stale_as_of'),
+            }
+            for t, e in snapshot['tickers'].items()
+        },
+    }
+
+
+def _check_version(header):
+    if header.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"지원하지 않는 스냅샷 버전: {header.get('version')} (필요: {SNAPSHOT_VERSION})")
+
+
+def _series_to_json(series):
+    return {
+        'd': series.index.strftime('%Y-%m-%d').tolist(),
+        'v': [round(float(v), 6) for v in series.values],
+    }
+
+
+def _frame_to_json(frame):
+    out = {'d': frame.index.strftime('%Y-%m-%d').tolist()}
+    for col in OHLC_COLUMNS:
+        out[col] = [None if pd.isna(v) else round(float(v), 6) for v in frame[col].values]
+    return out
+
+
+def _series_from_json(obj):
+    return pd.Series(obj['v'], index=pd.to_datetime(obj['d']), dtype=float)
+
+
+def _frame_from_json(obj):
+    return pd.DataFrame(
+        {col: obj[col] for col in OHLC_COLUMNS},
+        index=pd.to_datetime(obj['d']), dtype=float
+    )
+
+
+def _write_json(snapshot, path):
+    payload = _header(snapshot)
+    for ticker, entry in snapshot['tickers'].items():
+        payload['tickers'][ticker]['close'] = _series_to_json(entry['close'])
+        payload['tickers'][ticker]['ohlc'] = _frame_to_json(entry['ohlc'])
+    with open(path, 'w') as f:
+        json.dump(payload, f, separators=(',', ':'), ensure_ascii=False)
+
+
+def _read_json(path):
+    with open(path, 'r') as f:
+        payload = json.load(f)
+    _check_version(payload)
+    for entry in payload['tickers'].values():
+        entry['close'] = _series_from_json(entry.pop('close'))
+        entry['ohlc'] = _frame_from_json(entry.pop('ohlc'))
+    return payload
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        raise ImportError("Parquet 스냅샷에는 pyarrow 가 필요합니다 (pip install pyarrow)")
+
+
+def _write_parquet(snapshot, path):
+    """long 포맷 (ticker, kind, date, OHLC) + 스키마 메타데이터에 헤더 저장"""
+    pa = _import_pyarrow()
+    frames = []
+    for ticker, entry in snapshot['tickers'].items():
+        close = entry['close'].to_frame('Close')
+        close['kind'] = 'close'
+        ohlc = entry['ohlc'].copy()
+        ohlc['kind'] = 'ohlc'
+        for part in (close, ohlc):
+            part = part.rename_axis('date').reset_index()
+            part['ticker'] = ticker
+            frames.append(part)
+
+    columns = ['ticker', 'kind', 'date'] + OHLC_COLUMNS
+    if frames:
+        long = pd.concat(frames, ignore_index=True).reindex(columns=columns)
+    else:
+        long = pd.DataFrame(columns=columns)
+
+    table = pa.Table.from_pandas(long, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b'market_snapshot'] = json.dumps(_header(snapshot), ensure_ascii=False).encode('utf-8')
+    table = table.replace_schema_metadata(metadata)
+    pa.parquet.write_table(table, path, compression='zstd')
+
+
+def _read_parquet(path):
+    pa = _import_pyarrow()
+    table = pa.parquet.read_table(path)
+    header = json.loads(table.schema.metadata[b'market_snapshot'].decode('utf-8'))
+    _check_version(header)
+
+    long = table.to_pandas()
+    long['date'] = pd.to_datetime(long['date'])
+    for (ticker, kind), part in long.groupby(['ticker', 'kind']):
+        entry = header['tickers'].get(ticker)
+        if entry is None:
+            continue
+        part = part.set_index('date').sort_index()
+        if kind == 'close':
+            entry['close'] = part['Close'].rename(None)
+        else:
+            entry['ohlc'] = part[OHLC_COLUMNS]
+    return header
+
+
+def write_snapshot(snapshot, path=SNAPSHOT_FILE, fmt=None):
+    """스냅샷 저장 (fmt: 'json' | 'parquet', 생략 시 확장자로 판단)"""
+    fmt = _detect_format(path, fmt)
+    tmp_path = path + '.tmp'
+    if fmt == 'parquet':
+        _write_parquet(snapshot, tmp_path)
+    else:
+        _write_json(snapshot, tmp_path)
+    # 앱이 읽는 도중 덮어쓰지 않도록 교체는 한 번에
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path=SNAPSHOT_FILE, fmt=None):
+    """저장된 스냅샷 불러오기"""
+    if _detect_format(path, fmt) == 'parquet':
+        return _read_parquet(path)
+    return _read_json(path)
+
+
+# ===== CLI =====
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Market Dashboard 스냅샷 생성")
+    parser.add_argument('--out', default=SNAPSHOT_FILE, help="저장 경로 (.json / .parquet)")
+    parser.add_argument('--format', choices=['json', 'parquet'], default=None, help="저장 형식 (기본: 확장자로 판단)")
+    parser.add_argument('--tickers', nargs='*', default=None, help="조회할 티커 (기본: 설정 종목)")
+    parser.add_argument('--no-custom', action='store_true', help="사용자 추가 종목 제외")
+    parser.add_argument('--workers', type=int, default=4, help="동시 조회 수")
+    args = parser.parse_args(argv)
+
+    # 직전 스냅샷 = 조회 실패 종목의 마지막 정상값
+    previous = None
+    if os.path.exists(args.out):
+        try:
+            previous = load_snapshot(args.out, args.format)
+        except Exception as e:
+            print(f"직전 스냅샷을 읽을 수 없습니다: {e}")
+
+    snapshot = build_snapshot(
+        tickers=args.tickers,
+        custom_tickers=[] if args.no_custom else None,
+        max_workers=args.workers,
+        previous=previous,
+    )
+    write_snapshot(snapshot, args.out, args.format)
+
+    print(f"{args.out}: {len(snapshot['tickers'])}개 종목 저장 ({snapshot['generated_at']})")
+    if snapshot['missing']:
+        print(f"조회 실패: {', '.join(snapshot['missing'])}")
+    for row in snapshot['health']:
+        print(f"  [{row['scope']}] {row['key']}: 연속 실패 {row['failures']}회, 누적 {row['total_failures']}회 - {row['last_error']}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
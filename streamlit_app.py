@@ -4,15 +4,18 @@ Fear & Greed + 주요 지수 + 개별 종목/ETF + 사용자 추가 종목
 로컬 JSON 파일로 영구 저장 + 비밀번호 보호
 """
 import streamlit as st
-import requests
 from datetime import datetime, timedelta
-import yfinance as yf
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 import json
 import os
 
+import market_data
+import snapshot
+import risk
+from market_data import SAVE_FILE, load_custom_tickers, INDEX_TICKERS, ETF_TICKERS, STOCK_TICKERS
+
 # 페이지 설정
 st.set_page_config(
     page_title="Market Dashboard",
@@ -83,21 +86,6 @@ if not st.session_state.authenticated:
 # ===== 여기부터 메인 대시보드 =====
 
 # ===== 로컬 파일 저장 설정 =====
-SAVE_FILE = "custom_tickers.json"
-
-
-def load_custom_tickers():
-    """로컬 파일에서 사용자 티커 목록 불러오기"""
-    try:
-        if os.path.exists(SAVE_FILE):
-            with open(SAVE_FILE, 'r') as f:
-                data = json.load(f)
-                return data.get('custom_tickers', [])
-        return []
-    except:
-        return []
-
-
 def save_custom_tickers(tickers):
     """로컬 파일에 사용자 티커 목록 저장"""
     try:
@@ -191,6 +179,11 @@ st.markdown("""
         font-size: 11px;
         margin: 8px 0 2px 0;
     }
+    .stale-label {
+        color: #f57c00;
+        font-size: 11px;
+        margin: 0 0 4px 0;
+    }
     .footer-text {
         color: #adb5bd;
         font-size: 11px;
@@ -243,113 +236,86 @@ def get_fng_rating(value):
 
 
 # ===== 데이터 가져오기 =====
-@st.cache_data(ttl=300)
-def fetch_fear_greed():
+# 헤드리스 스냅샷 (python snapshot.py 로 생성) - 있으면 우선 사용
+SNAPSHOT_FILE = os.environ.get('MARKET_SNAPSHOT', snapshot.SNAPSHOT_FILE)
+SNAPSHOT_MAX_AGE = timedelta(minutes=int(os.environ.get('MARKET_SNAPSHOT_MAX_AGE', '60')))
+
+
+@st.cache_resource(max_entries=2)
+def _load_snapshot(path, mtime):
+    """파일이 바뀔 때만 다시 읽음 - 모든 세션이 같은 객체를 공유하므로 읽기 전용"""
+    return snapshot.load_snapshot(path)
+
+
+def get_snapshot():
+    """최신 스냅샷 (없거나 오래됐으면 None) - 화면을 그릴 때마다 한 번만 호출"""
+    if not os.path.exists(SNAPSHOT_FILE):
+        return None
     try:
-        url = "https://production.dataviz.cnn.io/index/fearandgreed/graphdata"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'application/json, text/plain, */*',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Referer': 'https://edition.cnn.com/',
-            'Origin': 'https://edition.cnn.com',
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        fg = data.get('fear_and_greed', {})
-        
-        return {
-            'score': fg.get('score', 0),
-            'previous_close': fg.get('previous_close', 0),
-            'previous_1_week': fg.get('previous_1_week', 0),
-            'previous_1_month': fg.get('previous_1_month', 0),
-            'previous_1_year': fg.get('previous_1_year', 0),
-            'success': True
-        }
+        snap = _load_snapshot(SNAPSHOT_FILE, os.path.getmtime(SNAPSHOT_FILE))
     except Exception as e:
-        return {'score': 0, 'success': False, 'error': str(e)}
+        st.warning(f"스냅샷을 읽을 수 없어 실시간 조회로 대체합니다: {e}")
+        return None
+    if datetime.now() - snapshot.snapshot_time(snap) > SNAPSHOT_MAX_AGE:
+        st.caption(f"스냅샷이 오래되어 ({snap['generated_at']}) 실시간 조회로 대체합니다.")
+        return None
+    return snap
+
+
+# 현재 화면에서 사용할 스냅샷 (메인 UI 시작 시 설정)
+active_snapshot = None
+
+
+# 캐시 함수는 (데이터, 실제 조회 시각) 반환 - 캐시 적중 시에도 처음 내려받은 시각이 유지됨
+@st.cache_data(ttl=300)
+def fetch_fear_greed():
+    return market_data.fetch_fear_greed(), datetime.now()
 
 
 @st.cache_data(ttl=300)
 def fetch_market_data(ticker):
-    try:
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=365*3 + 30)
-        
-        data = yf.download(ticker, start=start_date, end=end_date, progress=False)
-        if data.empty:
-            return None
-        
-        if isinstance(data.columns, pd.MultiIndex):
-            close = data['Close'][ticker].dropna()
-        else:
-            close = data['Close'].dropna()
-        
-        if len(close) == 0:
-            return None
-        
-        current = float(close.iloc[-1])
-        prev = float(close.iloc[-2]) if len(close) > 1 else current
-        change = ((current - prev) / prev) * 100 if prev != 0 else 0
-        
-        now = datetime.now()
-        
-        month_ago = now - timedelta(days=30)
-        history_1m = close[close.index >= month_ago.strftime('%Y-%m-%d')]
-        
-        year_ago = now - timedelta(days=365)
-        history_1y = close[close.index >= year_ago.strftime('%Y-%m-%d')]
-        
-        three_years_ago = now - timedelta(days=365*3)
-        history_3y = close[close.index >= three_years_ago.strftime('%Y-%m-%d')]
-        
-        return {
-            'current': current,
-            'change': change,
-            '1M': history_1m,
-            '1Y': history_1y,
-            '3Y': history_3y
-        }
-    except Exception as e:
-        return None
+    return market_data.fetch_market_data(ticker), datetime.now()
 
 
 @st.cache_data(ttl=300)
 def fetch_ohlc_data_6m(ticker):
-    try:
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=500)
-        
-        data = yf.download(ticker, start=start_date, end=end_date, progress=False)
-        if data.empty:
-            return None
-        
-        if isinstance(data.columns, pd.MultiIndex):
-            ohlc = pd.DataFrame({
-                'Open': data['Open'][ticker],
-                'High': data['High'][ticker],
-                'Low': data['Low'][ticker],
-                'Close': data['Close'][ticker]
-            }).dropna()
-        else:
-            ohlc = data[['Open', 'High', 'Low', 'Close']].dropna()
-        
-        ohlc['MA200'] = ohlc['Close'].rolling(window=200).mean()
-        ohlc_6m = ohlc.tail(130)
-        
-        return ohlc_6m
-    except Exception as e:
-        return None
+    return market_data.fetch_ohlc_data_6m(ticker), datetime.now()
 
 
 @st.cache_data(ttl=300)
 def get_ticker_name(ticker):
-    try:
-        info = yf.Ticker(ticker).info
-        return info.get('shortName', ticker)
-    except:
-        return ticker
+    return market_data.get_ticker_name(ticker)
+
+
+# 아래 get_* 는 (데이터, stale_as_of) 반환
+# 조회 실패 / 서킷브레이커 차단 시 마지막 정상값과 그 시각 (없으면 (None, None))
+def get_fear_greed():
+    snap = active_snapshot
+    if snap is not None and snap['fear_greed'].get('success'):
+        stale = snap['fear_greed'].get('stale_as_of')
+        return snap['fear_greed'], datetime.fromisoformat(stale) if stale else None
+    return market_data.fetch_with_fallback(fetch_fear_greed, 'fear_greed')
+
+
+def get_market_data(ticker):
+    snap = active_snapshot
+    if snap is not None and ticker in snap['tickers']:
+        return snapshot.market_data_from_snapshot(snap, ticker), snapshot.stale_as_of(snap, ticker)
+    return market_data.fetch_with_fallback(lambda: fetch_market_data(ticker), f'market:{ticker}')
+
+
+def get_ohlc_data_6m(ticker):
+    snap = active_snapshot
+    if snap is not None and ticker in snap['tickers']:
+        return snapshot.ohlc_from_snapshot(snap, ticker), snapshot.stale_as_of(snap, ticker)
+    return market_data.fetch_with_fallback(lambda: fetch_ohlc_data_6m(ticker), f'ohlc:{ticker}')
+
+
+def get_name(ticker):
+    snap = active_snapshot
+    if snap is not None and ticker in snap['tickers']:
+        return snap['tickers'][ticker]['name']
+    return get_ticker_name(ticker)
 
 
 # ===== 차트 함수 =====
@@ -494,11 +460,52 @@ def create_candlestick_chart_with_ma(ohlc_data, height=180):
     return fig
 
 
+def create_correlation_heatmap(corr):
+    if corr is None or len(corr) == 0:
+        return None
+    
+    size = len(corr)
+    fig = go.Figure(go.Heatmap(
+        z=corr.values,
+        x=corr.columns,
+        y=corr.index,
+        zmin=-1,
+        zmax=1,
+        colorscale=[[0, '#d32f2f'], [0.5, '#f8f9fa'], [1, '#1976d2']],
+        colorbar=dict(thickness=10, tickfont={'size': 9, 'color': '#6c757d'}),
+        hovertemplate='%{y} / %{x}: %{z:.2f}<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='#f8f9fa',
+        font={'color': '#6c757d', 'size': 10},
+        height=max(300, min(12 * size, 1200)),
+        margin=dict(l=5, r=5, t=5, b=5),
+        xaxis=dict(tickfont={'size': 8, 'color': '#6c757d'}, showticklabels=size <= 60),
+        yaxis=dict(tickfont={'size': 8, 'color': '#6c757d'}, showticklabels=size <= 60, autorange='reversed'),
+        dragmode=False
+    )
+    
+    return fig
+
+
+def stale_label_html(stale_as_of):
+    """마지막 정상값을 보여줄 때의 라벨 (최신이면 빈 문자열)"""
+    if stale_as_of is None:
+        return ''
+    return f'<p class="stale-label">⚠️ {stale_as_of.strftime("%m-%d %H:%M")} 기준 (갱신 실패)</p>'
+
+
 CHART_CONFIG = {
     'displayModeBar': False,
     'staticPlot': True
 }
 
+HEATMAP_CONFIG = {
+    'displayModeBar': False
+}
+
 
 # ===== 메인 UI =====
 st.markdown('<p class="main-title">📊 Market Dashboard</p>', unsafe_allow_html=True)
@@ -507,13 +514,15 @@ if st.button("🔄 새로고침"):
     st.cache_data.clear()
     st.session_state.custom_tickers = load_custom_tickers()
 
+active_snapshot = get_snapshot()
+
 # ===== 1. Fear & Greed Index =====
 st.markdown("---")
 st.markdown('<p class="section-title">Fear & Greed Index</p>', unsafe_allow_html=True)
 
-fng_data = fetch_fear_greed()
+fng_data, fng_stale = get_fear_greed()
 
-if fng_data['success'] and fng_data['score'] > 0:
+if fng_data and fng_data['success'] and fng_data['score'] > 0:
     score = fng_data['score']
     rating = get_fng_rating(score)
     color = get_fng_color(score)
@@ -526,6 +535,9 @@ if fng_data['success'] and fng_data['score'] > 0:
         unsafe_allow_html=True
     )
     
+    if fng_stale:
+        st.markdown(stale_label_html(fng_stale), unsafe_allow_html=True)
+    
     prev_close = fng_data.get('previous_close', 0)
     prev_week = fng_data.get('previous_1_week', 0)
     prev_month = fng_data.get('previous_1_month', 0)
@@ -560,7 +572,7 @@ def render_index_section(title, ticker, format_str='{:.2f}', show_candle=False,
     """지수 섹션 렌더링"""
     st.markdown("---")
     
-    data = fetch_market_data(ticker)
+    data, stale_as_of = get_market_data(ticker)
     
     if data:
         current = data['current']
@@ -584,6 +596,8 @@ def render_index_section(title, ticker, format_str='{:.2f}', show_candle=False,
                     </span>
                 </div>
                 """, unsafe_allow_html=True)
+                if stale_as_of:
+                    st.markdown(stale_label_html(stale_as_of), unsafe_allow_html=True)
             with col2:
                 if st.button("🗑️", key=f"delete_{ticker}"):
                     new_tickers = [t for t in st.session_state.custom_tickers if t != ticker]
@@ -599,12 +613,17 @@ def render_index_section(title, ticker, format_str='{:.2f}', show_candle=False,
                 </span>
             </div>
             """, unsafe_allow_html=True)
+            if stale_as_of:
+                st.markdown(stale_label_html(stale_as_of), unsafe_allow_html=True)
         
         # 6개월 캔들스틱 차트 + 200일 MA
         if show_candle:
-            ohlc_data = fetch_ohlc_data_6m(ticker)
+            ohlc_data, ohlc_stale_as_of = get_ohlc_data_6m(ticker)
             if ohlc_data is not None and len(ohlc_data) > 0:
                 st.markdown('<p class="period-label">6개월 일봉 + MA 200 <span style="color: #ff6f00; font-weight: bold;">━</span></p>', unsafe_allow_html=True)
+                # 현재가와 따로 조회되므로 일봉만 오래된 값일 수 있음
+                if ohlc_stale_as_of and ohlc_stale_as_of != stale_as_of:
+                    st.markdown(stale_label_html(ohlc_stale_as_of), unsafe_allow_html=True)
                 candle_chart = create_candlestick_chart_with_ma(ohlc_data)
                 if candle_chart:
                     st.plotly_chart(candle_chart, use_container_width=True, config=CHART_CONFIG, key=f"{ticker}_candle")
@@ -627,38 +646,20 @@ def render_index_section(title, ticker, format_str='{:.2f}', show_candle=False,
 
 
 # ===== 주요 지수 =====
-render_index_section("VIX (공포지수)", "^VIX", '{:.2f}', show_candle=False, show_1m=True)
-render_index_section("10년물 국채금리 (%)", "^TNX", '{:.2f}', show_candle=False, show_1m=False)
-render_index_section("하이일드 (HYG ETF)", "HYG", '{:.2f}', show_candle=False, show_1m=False)
-render_index_section("달러 인덱스", "DX-Y.NYB", '{:.2f}', show_candle=False, show_1m=False)
-render_index_section("금 (Gold)", "GC=F", '{:,.0f}', show_candle=False, show_1m=False)
-render_index_section("비트코인", "BTC-USD", '{:,.0f}', show_candle=True, show_1m=False)
-render_index_section("NASDAQ", "^IXIC", '{:,.0f}', show_candle=True, show_1m=False)
+for title, ticker, format_str, show_candle, show_1m in INDEX_TICKERS:
+    render_index_section(title, ticker, format_str, show_candle=show_candle, show_1m=show_1m)
 
 
 # ===== 개별 종목 / ETF =====
 st.markdown('<div class="section-divider">📈 ETF & 개별종목</div>', unsafe_allow_html=True)
 
 # ETF
-render_index_section("SPY (S&P 500 ETF)", "SPY", '{:.2f}', show_candle=True, show_1m=False)
-render_index_section("QQQ (NASDAQ 100 ETF)", "QQQ", '{:.2f}', show_candle=True, show_1m=False)
-render_index_section("TQQQ (NASDAQ 3x)", "TQQQ", '{:.2f}', show_candle=True, show_1m=False)
-render_index_section("SCHD (배당 ETF)", "SCHD", '{:.2f}', show_candle=True, show_1m=False)
-render_index_section("BLOK (블록체인 ETF)", "BLOK", '{:.2f}', show_candle=True, show_1m=False)
+for title, ticker, format_str, show_candle, show_1m in ETF_TICKERS:
+    render_index_section(title, ticker, format_str, show_candle=show_candle, show_1m=show_1m)
 
 # 개별종목
-render_index_section("AAPL (Apple)", "AAPL", '{:.2f}', show_candle=True, show_1m=False)
-render_index_section("CRCL (Circle)", "CRCL", '{:.2f}', show_candle=True, show_1m=False)
-render_index_section("DIS (Disney)", "DIS", '{:.2f}', show_candle=True, show_1m=False)
-render_index_section("GOOG (Alphabet)", "GOOG", '{:.2f}', show_candle=True, show_1m=False)
-render_index_section("INMD (InMode)", "INMD", '{:.2f}', show_candle=True, show_1m=False)
-render_index_section("MSTR (MicroStrategy)", "MSTR", '{:.2f}', show_candle=True, show_1m=False)
-render_index_section("NVDA (NVIDIA)", "NVDA", '{:.2f}', show_candle=True, show_1m=False)
-render_index_section("PFE (Pfizer)", "PFE", '{:.2f}', show_candle=True, show_1m=False)
-render_index_section("PLTR (Palantir)", "PLTR", '{:.2f}', show_candle=True, show_1m=False)
-render_index_section("TSLA (Tesla)", "TSLA", '{:.2f}', show_candle=True, show_1m=False)
-render_index_section("UNH (UnitedHealth)", "UNH", '{:.2f}', show_candle=True, show_1m=False)
-render_index_section("XOM (ExxonMobil)", "XOM", '{:.2f}', show_candle=True, show_1m=False)
+for title, ticker, format_str, show_candle, show_1m in STOCK_TICKERS:
+    render_index_section(title, ticker, format_str, show_candle=show_candle, show_1m=show_1m)
 
 
 # ===== 사용자 추가 종목 =====
@@ -666,10 +667,49 @@ if len(st.session_state.custom_tickers) > 0:
     st.markdown('<div class="section-divider">⭐ 내가 추가한 종목</div>', unsafe_allow_html=True)
     
     for ticker in st.session_state.custom_tickers:
-        ticker_name = get_ticker_name(ticker)
+        ticker_name = get_name(ticker)
         render_index_section(f"{ticker} ({ticker_name})", ticker, '{:.2f}', show_candle=True, show_1m=False, show_delete=True)
 
 
+# ===== 크로스에셋 리스크 =====
+def render_risk_section(tickers):
+    """상관계수 히트맵 + 베타/변동성 표"""
+    st.markdown(f'<div class="section-divider">🧮 리스크 ({risk.RISK_WINDOW}일)</div>', unsafe_allow_html=True)
+    
+    closes = {}
+    excluded = []
+    for ticker in tickers:
+        data, stale_as_of = get_market_data(ticker)
+        if stale_as_of:
+            # 갱신 실패한 시계열은 다른 종목과 기간이 어긋나므로 제외
+            excluded.append(ticker)
+        elif data and len(data['3Y']) > 0:
+            closes[ticker] = data['3Y']
+    
+    if len(closes) < 2:
+        st.warning("리스크 계산에 필요한 데이터가 부족합니다.")
+        return
+    
+    if excluded:
+        st.caption(f"갱신 실패로 제외: {', '.join(excluded)}")
+    
+    returns = risk.build_returns(closes)
+    # 새 일봉만 누적 갱신 (종목 구성이 바뀌면 새로 계산)
+    st.session_state.risk_state = risk.update_risk(st.session_state.get('risk_state'), returns)
+    state = st.session_state.risk_state
+    
+    st.markdown('<p class="period-label">상관계수</p>', unsafe_allow_html=True)
+    heatmap = create_correlation_heatmap(state.correlation())
+    if heatmap:
+        st.plotly_chart(heatmap, use_container_width=True, config=HEATMAP_CONFIG, key="risk_heatmap")
+    
+    st.markdown('<p class="period-label">베타 / 변동성</p>', unsafe_allow_html=True)
+    st.dataframe(state.risk_table().round(2), use_container_width=True)
+
+
+render_risk_section(list(dict.fromkeys(market_data.configured_tickers() + st.session_state.custom_tickers)))
+
+
 # ===== 종목 추가 버튼 =====
 st.markdown("---")
 
@@ -694,7 +734,10 @@ with st.form(key="add_ticker_form", clear_on_submit=True):
             st.warning(f"'{ticker_upper}'는 이미 추가되어 있습니다.")
         else:
             # 티커 유효성 검사
-            test_data = fetch_market_data(ticker_upper)
+            try:
+                test_data, _ = fetch_market_data(ticker_upper)
+            except market_data.DataUnavailable:
+                test_data = None
             if test_data:
                 new_tickers = st.session_state.custom_tickers + [ticker_upper]
                 if save_custom_tickers(new_tickers):
@@ -706,9 +749,27 @@ with st.form(key="add_ticker_form", clear_on_submit=True):
                 st.error(f"'{ticker_upper}' 티커를 찾을 수 없습니다.")
 
 
+# ===== 데이터 소스 상태 (운영자용) =====
+# 이 앱 프로세스의 실시간 조회 + 스냅샷 작업의 마지막 실행 결과
+health = [dict(row, source='app') for row in market_data.breaker_stats()]
+if active_snapshot is not None:
+    health += [dict(row, source='snapshot') for row in active_snapshot.get('health', [])]
+if health:
+    with st.expander(f"🩺 데이터 소스 상태 (실패 {len(health)}건)"):
+        health_df = pd.DataFrame(health).reindex(columns=[
+            'source', 'scope', 'key', 'failures', 'total_failures',
+            'open_until', 'last_success', 'last_failure', 'last_error'
+        ])
+        st.dataframe(health_df.where(health_df.notna(), '').astype(str), use_container_width=True, hide_index=True)
+
+
 # 업데이트 시간
 st.markdown("---")
+if active_snapshot is not None:
+    updated_at = snapshot.snapshot_time(active_snapshot).strftime("%Y-%m-%d %H:%M:%S") + " (스냅샷)"
+else:
+    updated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 st.markdown(
-    f'<p class="footer-text">마지막 업데이트: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}<br>Data: CNN, Yahoo Finance</p>',
+    f'<p class="footer-text">마지막 업데이트: {updated_at}<br>Data: CNN, Yahoo Finance</p>',
     unsafe_allow_html=True
 )
@@ -0,0 +1,232 @@
+"""
+market_data 서킷브레이커: 종목 오류 / 제공처 장애 구분, 마지막 정상값 fallback, 상태 복원
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import market_data
+from yfinance.exceptions import YFPricesMissingError
+
+
+GOOD = {'SPY', 'QQQ'}
+
+# fixture 가 바꿔치기하기 전의 실제 probe
+yahoo_reachable = market_data._yahoo_reachable
+
+
+class FakeTicker:
+    """GOOD 은 정상 일봉, 그 외는 종목 오류 (network=True 면 네트워크 오류)"""
+    network = False
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+
+    def history(self, start=None, end=None, raise_errors=False):
+        if FakeTicker.network:
+            raise ConnectionError("could not resolve host")
+        if self.ticker not in GOOD:
+            raise YFPricesMissingError(self.ticker, "")
+        index = pd.bdate_range(end=datetime.now(), periods=300, tz='America/New_York')
+        close = np.linspace(100, 110, len(index))
+        return pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close}, index=index)
+
+
+def fetched(value):
+    return value, datetime.now()
+
+
+def fake_download(good):
+    """yf.download 대체 - good 만 일봉이 있는 (필드, 티커) MultiIndex 프레임"""
+    def download(tickers, **kwargs):
+        index = pd.bdate_range(end=datetime.now(), periods=300)
+        close = np.linspace(100, 110, len(index))
+        columns = pd.MultiIndex.from_product([['Open', 'High', 'Low', 'Close'], list(tickers)])
+        frame = pd.DataFrame(np.nan, index=index, columns=columns)
+        for ticker in tickers:
+            if ticker in good:
+                for field in ['Open', 'High', 'Low', 'Close']:
+                    frame[(field, ticker)] = close
+        return frame
+    return download
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(market_data.yf, 'Ticker', FakeTicker)
+    monkeypatch.setattr(market_data, 'TICKER_BREAKER', market_data.CircuitBreaker(threshold=1, base_delay=60))
+    monkeypatch.setattr(market_data, 'PROVIDER_BREAKER', market_data.CircuitBreaker(threshold=5, base_delay=30))
+    monkeypatch.setattr(market_data, '_last_good', {})
+    monkeypatch.setattr(market_data, '_yahoo_reachable', lambda: not FakeTicker.network)
+    FakeTicker.network = False
+
+
+def test_dead_tickers_do_not_open_provider():
+    for ticker in ['DEAD1', 'DEAD2', 'DEAD3', 'DEAD4', 'DEAD5', 'DEAD6']:
+        with pytest.raises(market_data.DataUnavailable):
+            market_data.fetch_market_data(ticker)
+
+    assert market_data.PROVIDER_BREAKER.allow(market_data.YAHOO)
+    data, stale = market_data.fetch_with_fallback(lambda: fetched(market_data.fetch_market_data('QQQ')), 'market:QQQ')
+    assert data is not None and stale is None
+
+
+def test_dead_ticker_is_blocked_with_backoff():
+    with pytest.raises(market_data.DataUnavailable):
+        market_data.fetch_market_data('DEAD')
+    with pytest.raises(market_data.CircuitOpen):
+        market_data.fetch_market_data('DEAD')
+
+    entry = market_data.TICKER_BREAKER._state['DEAD']
+    assert entry['failures'] == 1
+    later = entry['open_until'] + timedelta(seconds=1)
+    assert market_data.TICKER_BREAKER.allow('DEAD', now=later)
+    market_data.TICKER_BREAKER.record_failure('DEAD', 'again', now=later)
+    assert entry['open_until'] - later == timedelta(seconds=120)
+
+
+def test_network_errors_open_provider_only():
+    FakeTicker.network = True
+    for ticker in ['SPY', 'QQQ', 'AAPL', 'MSFT', 'NVDA']:
+        with pytest.raises(market_data.DataUnavailable):
+            market_data.fetch_market_data(ticker)
+
+    assert not market_data.PROVIDER_BREAKER.allow(market_data.YAHOO)
+    assert market_data.TICKER_BREAKER.stats() == []
+    with pytest.raises(market_data.CircuitOpen):
+        market_data.fetch_market_data('SPY')
+
+
+def test_missing_ticker_during_outage_counts_against_provider(monkeypatch):
+    # yfinance 는 timezone 조회 실패(네트워크)도 '종목 없음'으로 올림
+    monkeypatch.setattr(market_data, '_yahoo_reachable', lambda: False)
+    for ticker in ['DEAD1', 'DEAD2', 'DEAD3', 'DEAD4', 'DEAD5']:
+        with pytest.raises(market_data.DataUnavailable):
+            market_data.fetch_market_data(ticker)
+
+    assert not market_data.PROVIDER_BREAKER.allow(market_data.YAHOO)
+    assert market_data.TICKER_BREAKER.stats() == []
+
+
+def test_blocked_ticker_does_not_use_provider_retry():
+    now = datetime.now()
+    market_data.TICKER_BREAKER.record_failure('DEAD', 'x', now=now)
+    for _ in range(5):
+        market_data.PROVIDER_BREAKER.record_failure(market_data.YAHOO, 'x', now=now - timedelta(seconds=31))
+
+    with pytest.raises(market_data.CircuitOpen):
+        market_data.fetch_market_data('DEAD')
+    # 제공처 재시도 기회는 그대로 남아 있음
+    assert market_data.PROVIDER_BREAKER.allow(market_data.YAHOO)
+
+
+def test_blocked_provider_does_not_use_ticker_retry():
+    now = datetime.now()
+    market_data.TICKER_BREAKER.record_failure('SPY', 'x', now=now - timedelta(seconds=61))
+    for _ in range(5):
+        market_data.PROVIDER_BREAKER.record_failure(market_data.YAHOO, 'x', now=now)
+
+    with pytest.raises(market_data.CircuitOpen):
+        market_data.fetch_market_data('SPY')
+    # 티커 재시도 기회는 그대로 남아 있음
+    assert market_data.TICKER_BREAKER.allow('SPY')
+
+
+def test_ticker_breaker_shared_across_paths(monkeypatch):
+    with pytest.raises(market_data.DataUnavailable):
+        market_data.fetch_market_data('DEAD')
+    with pytest.raises(market_data.CircuitOpen):
+        market_data.fetch_ohlc_data_6m('DEAD')
+
+    calls = []
+    monkeypatch.setattr(market_data.yf, 'download', lambda tickers, **kwargs: calls.append(tickers))
+    assert market_data.fetch_history_batch(['DEAD'], datetime.now() - timedelta(days=30), datetime.now()) == {}
+    assert calls == []
+
+
+def test_fallback_serves_last_good_with_timestamp():
+    data, stale = market_data.fetch_with_fallback(lambda: fetched(market_data.fetch_market_data('SPY')), 'market:SPY')
+    assert stale is None
+
+    FakeTicker.network = True
+    stale_data, stale = market_data.fetch_with_fallback(lambda: fetched(market_data.fetch_market_data('SPY')), 'market:SPY')
+    assert stale_data is data
+    assert stale is not None
+
+    assert market_data.fetch_with_fallback(lambda: fetched(market_data.fetch_market_data('QQQ')), 'market:QQQ') == (None, None)
+
+
+def test_fallback_keeps_download_time_on_cache_hits():
+    # st.cache_data 처럼 첫 결과를 그대로 돌려주는 래퍼
+    cache = {}
+    downloaded_at = datetime(2026, 1, 2, 9, 30)
+
+    def cached_fetch():
+        if 'SPY' not in cache:
+            cache['SPY'] = (market_data.fetch_market_data('SPY'), downloaded_at)
+        return cache['SPY']
+
+    for _ in range(3):
+        data, stale = market_data.fetch_with_fallback(cached_fetch, 'market:SPY')
+        assert stale is None
+
+    cache.clear()
+    FakeTicker.network = True
+    stale_data, stale = market_data.fetch_with_fallback(cached_fetch, 'market:SPY')
+    assert stale_data is data
+    assert stale == downloaded_at
+
+
+def test_restore_breakers_round_trip():
+    with pytest.raises(market_data.DataUnavailable):
+        market_data.fetch_market_data('DEAD')
+    rows = [
+        {k: v.isoformat() if isinstance(v, datetime) else v for k, v in row.items()}
+        for row in market_data.breaker_stats()
+    ]
+
+    market_data.TICKER_BREAKER = market_data.CircuitBreaker(threshold=1, base_delay=60)
+    market_data.restore_breakers(rows)
+    with pytest.raises(market_data.CircuitOpen):
+        market_data.fetch_market_data('DEAD')
+
+
+def test_history_batch_records_dead_tickers(monkeypatch):
+    monkeypatch.setattr(market_data.yf, 'download', fake_download(GOOD))
+    result = market_data.fetch_history_batch(['SPY', 'QQQ', 'DEAD'], datetime.now() - timedelta(days=500), datetime.now())
+
+    assert sorted(result) == ['QQQ', 'SPY']
+    assert [row['key'] for row in market_data.TICKER_BREAKER.stats()] == ['DEAD']
+    assert market_data.PROVIDER_BREAKER.stats() == []
+
+
+@pytest.mark.parametrize('reachable', [True, False])
+def test_history_batch_empty_result(monkeypatch, reachable):
+    # 전부 빈 결과: Yahoo 가 응답하면 종목 오류, 아니면(장애 / 요청 제한) 제공처 오류
+    monkeypatch.setattr(market_data.yf, 'download', fake_download(set()))
+    monkeypatch.setattr(market_data, '_yahoo_reachable', lambda: reachable)
+    result = market_data.fetch_history_batch(['SPY', 'QQQ'], datetime.now() - timedelta(days=500), datetime.now())
+
+    assert result == {}
+    ticker_keys = [row['key'] for row in market_data.TICKER_BREAKER.stats()]
+    provider_keys = [row['key'] for row in market_data.PROVIDER_BREAKER.stats()]
+    if reachable:
+        assert sorted(ticker_keys) == ['QQQ', 'SPY'] and provider_keys == []
+    else:
+        assert ticker_keys == [] and provider_keys == [market_data.YAHOO]
+
+
+@pytest.mark.parametrize('status, expected', [(200, True), (404, True), (429, False), (503, False)])
+def test_probe_status(monkeypatch, status, expected):
+    class Response:
+        status_code = status
+
+    monkeypatch.setattr(market_data, '_probe', {'checked_at': None, 'reachable': True})
+    monkeypatch.setattr(market_data.requests, 'get', lambda *args, **kwargs: Response())
+    assert yahoo_reachable() is expected
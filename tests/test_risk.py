@@ -0,0 +1,118 @@
+"""
+risk.RollingRisk 누적 갱신 결과를 pandas 전체 재계산과 비교
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import risk
+
+
+WINDOW = risk.RISK_WINDOW
+ATOL = 1e-12
+
+
+def make_returns(rows=300, columns=('SPY', 'QQQ', 'AAPL', 'CRCL', 'BTC-USD'), seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2024-01-01', periods=rows)
+    market = rng.normal(0, 0.01, rows)
+    data = {
+        ticker: market * (0.5 + i * 0.3) + rng.normal(0, 0.01, rows)
+        for i, ticker in enumerate(columns)
+    }
+    returns = pd.DataFrame(data, index=index)
+    # 신규 상장 종목 + 드문드문 결측
+    returns.iloc[:rows - 40, columns.index('CRCL')] = np.nan
+    returns.iloc[::7, columns.index('BTC-USD')] = np.nan
+    return returns
+
+
+def assert_matches(state, returns):
+    tail = returns.tail(WINDOW)
+    expected_corr = tail.corr(min_periods=risk.MIN_PERIODS)
+    expected_vol = (tail.std() * np.sqrt(risk.TRADING_DAYS)).where(tail.count() >= risk.MIN_PERIODS)
+
+    np.testing.assert_allclose(state.correlation().values, expected_corr.values, atol=ATOL)
+    np.testing.assert_allclose(state.volatility().values, expected_vol.values, atol=ATOL)
+
+    spy = tail['SPY']
+    expected_beta = tail.apply(lambda s: s.cov(spy, min_periods=risk.MIN_PERIODS) / spy[s.notna()].var())
+    np.testing.assert_allclose(state.beta('SPY').values, expected_beta.values, atol=ATOL)
+
+
+def test_from_returns():
+    returns = make_returns()
+    assert_matches(risk.RollingRisk.from_returns(returns), returns)
+
+
+def test_from_returns_shorter_than_window():
+    returns = make_returns(rows=30)
+    state = risk.RollingRisk.from_returns(returns)
+    assert_matches(state, returns)
+    # 관측 부족(CRCL 은 10일)은 NaN
+    assert state.correlation().loc['CRCL'].isna().all()
+
+
+@pytest.mark.parametrize('start', [10, 100, 250])
+def test_extend_matches_full_recompute(start):
+    # start=10 -> 윈도우가 차기 전부터, 250 -> window 보다 많은 갱신 + _rebuild 포함
+    returns = make_returns()
+    state = risk.RollingRisk.from_returns(returns.iloc[:start])
+    added = state.extend(returns)
+    assert added == len(returns) - start
+    assert state.last_date == returns.index[-1]
+    assert_matches(state, returns)
+
+
+def test_extend_from_empty_state():
+    returns = make_returns()
+    state = risk.RollingRisk(returns.columns)
+    state.extend(returns)
+    assert_matches(state, returns)
+
+
+def test_extend_replaces_last_row():
+    returns = make_returns()
+    state = risk.RollingRisk.from_returns(returns.iloc[:200])
+    state.extend(returns.iloc[:200])
+
+    revised = returns.copy()
+    revised.iloc[199] = revised.iloc[199] * 3
+    assert state.extend(revised.iloc[:200]) == 0
+    assert_matches(state, revised.iloc[:200])
+
+    state.extend(revised)
+    assert_matches(state, revised)
+
+
+def test_update_risk_rebuilds_on_new_tickers():
+    returns = make_returns()
+    state = risk.update_risk(None, returns.iloc[:, :3])
+    state = risk.update_risk(state, returns)
+    assert state.tickers == list(returns.columns)
+    assert_matches(state, returns)
+
+
+def test_build_returns_does_not_fill_holidays():
+    index = pd.date_range('2024-07-01', periods=10, freq='D')
+    btc = pd.Series(np.linspace(100, 110, 10), index=index)
+    # 7/4 휴장 + 마지막 이틀은 시세 없음
+    spy = pd.Series(np.linspace(50, 55, 10), index=index).drop(
+        [pd.Timestamp('2024-07-04'), pd.Timestamp('2024-07-06'), pd.Timestamp('2024-07-07')]
+    ).iloc[:-2]
+
+    returns = risk.build_returns({'SPY': spy, 'BTC-USD': btc})
+
+    assert (returns.index.dayofweek < 5).all()
+    assert np.isnan(returns.loc['2024-07-04', 'SPY'])
+    # 휴장 다음 날 수익률은 7/3 -> 7/5 종가 기준
+    assert returns.loc['2024-07-05', 'SPY'] == pytest.approx(spy['2024-07-05'] / spy['2024-07-03'] - 1)
+    # 주말을 건너뛴 월요일 수익률은 금 -> 월
+    assert returns.loc['2024-07-08', 'BTC-USD'] == pytest.approx(btc['2024-07-08'] / btc['2024-07-05'] - 1)
+    assert returns['SPY'].iloc[-2:].isna().all()
+    assert not (returns.fillna(1.0) == 0).any().any()
@@ -0,0 +1,133 @@
+"""
+snapshot: 배치 조회로 생성 -> JSON / Parquet 저장 / 불러오기, 버전 확인, 실패 종목 이어받기
+"""
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import market_data
+import snapshot
+
+
+TICKERS = ['SPY', 'QQQ', 'AAPL']
+FIELDS = ['Open', 'High', 'Low', 'Close']
+
+
+class FakeDownload:
+    """yf.download 대체 - good 에 있는 티커만 일봉이 있는 (필드, 티커) MultiIndex 프레임"""
+
+    def __init__(self, good):
+        self.good = set(good)
+        self.calls = []
+
+    def __call__(self, tickers, **kwargs):
+        self.calls.append(list(tickers))
+        index = pd.bdate_range(end=datetime.now(), periods=800)
+        columns = pd.MultiIndex.from_product([FIELDS, list(tickers)])
+        frame = pd.DataFrame(np.nan, index=index, columns=columns)
+        for i, ticker in enumerate(tickers):
+            if ticker in self.good:
+                close = np.linspace(100 + i, 150 + i, len(index))
+                for field in FIELDS:
+                    frame[(field, ticker)] = close
+        return frame
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(market_data, 'TICKER_BREAKER', market_data.CircuitBreaker(threshold=1, base_delay=60))
+    monkeypatch.setattr(market_data, 'PROVIDER_BREAKER', market_data.CircuitBreaker(threshold=5, base_delay=30))
+    monkeypatch.setattr(market_data, '_last_good', {})
+    monkeypatch.setattr(market_data, '_yahoo_reachable', lambda: True)
+    monkeypatch.setattr(market_data, 'fetch_fear_greed', lambda: {'score': 55, 'rating': 'greed', 'success': True})
+
+
+def build(monkeypatch, good, previous=None):
+    download = FakeDownload(good)
+    monkeypatch.setattr(market_data.yf, 'download', download)
+    snap = snapshot.build_snapshot(tickers=TICKERS, custom_tickers=[], previous=previous)
+    return snap, download
+
+
+def assert_same_snapshot(loaded, snap):
+    assert loaded['version'] == snapshot.SNAPSHOT_VERSION
+    assert loaded['generated_at'] == snap['generated_at']
+    assert loaded['fear_greed'] == snap['fear_greed']
+    assert loaded['health'] == snap['health']
+    assert sorted(loaded['tickers']) == sorted(snap['tickers'])
+    for ticker, entry in snap['tickers'].items():
+        got = loaded['tickers'][ticker]
+        assert got['current'] == pytest.approx(entry['current'])
+        assert got['stale_as_of'] == entry['stale_as_of']
+        pd.testing.assert_series_equal(got['close'], entry['close'], check_names=False, check_freq=False, atol=1e-6)
+        pd.testing.assert_frame_equal(got['ohlc'], entry['ohlc'], check_names=False, check_freq=False, atol=1e-6)
+
+
+def test_build_snapshot(monkeypatch):
+    snap, download = build(monkeypatch, TICKERS)
+
+    assert download.calls == [TICKERS]
+    assert snap['version'] == snapshot.SNAPSHOT_VERSION
+    assert snap['missing'] == []
+    assert snap['fear_greed']['score'] == 55
+    assert list(snap['tickers']) == TICKERS
+    assert all(entry['stale_as_of'] is None for entry in snap['tickers'].values())
+    assert snapshot.market_data_from_snapshot(snap, 'SPY')['current'] == snap['tickers']['SPY']['current']
+
+
+@pytest.mark.parametrize('filename', ['market_snapshot.json', 'market_snapshot.parquet'])
+def test_round_trip(monkeypatch, tmp_path, filename):
+    if filename.endswith('.parquet'):
+        pytest.importorskip('pyarrow')
+    snap, _ = build(monkeypatch, TICKERS)
+    path = str(tmp_path / filename)
+
+    snapshot.write_snapshot(snap, path)
+    assert not os.path.exists(path + '.tmp')
+    assert_same_snapshot(snapshot.load_snapshot(path), snap)
+
+
+def test_version_mismatch_is_rejected(monkeypatch, tmp_path):
+    snap, _ = build(monkeypatch, TICKERS)
+    path = str(tmp_path / 'market_snapshot.json')
+    snapshot.write_snapshot(snap, path)
+
+    with open(path) as f:
+        payload = json.load(f)
+    payload['version'] = snapshot.SNAPSHOT_VERSION + 1
+    with open(path, 'w') as f:
+        json.dump(payload, f)
+
+    with pytest.raises(ValueError):
+        snapshot.load_snapshot(path)
+
+
+def test_failed_ticker_is_carried_over_as_stale(monkeypatch, tmp_path):
+    path = str(tmp_path / 'market_snapshot.json')
+    first, _ = build(monkeypatch, TICKERS)
+    snapshot.write_snapshot(first, path)
+    previous = snapshot.load_snapshot(path)
+
+    # 두 번째 실행: AAPL 만 빈 데이터
+    second, _ = build(monkeypatch, ['SPY', 'QQQ'], previous=previous)
+
+    assert second['missing'] == ['AAPL']
+    assert snapshot.stale_as_of(second, 'AAPL') == snapshot.snapshot_time(first)
+    assert second['tickers']['AAPL']['current'] == pytest.approx(first['tickers']['AAPL']['current'])
+    assert snapshot.stale_as_of(second, 'SPY') is None
+    assert [row['key'] for row in second['health']] == ['AAPL']
+
+    # 세 번째 실행: 이어받은 브레이커가 AAPL 을 차단 -> 조회하지 않고 처음 시각 그대로 유지
+    snapshot.write_snapshot(second, path)
+    monkeypatch.setattr(market_data, 'TICKER_BREAKER', market_data.CircuitBreaker(threshold=1, base_delay=60))
+    third, download = build(monkeypatch, TICKERS, previous=snapshot.load_snapshot(path))
+
+    assert download.calls == [['SPY', 'QQQ']]
+    assert snapshot.stale_as_of(third, 'AAPL') == snapshot.snapshot_time(first)